@@ -4,19 +4,59 @@ import requests
 import m3u8
 import os
 import subprocess
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlparse
 import threading
 import sys
 import shutil
 import tempfile
 import platform
+import json
+import re
+import time
+import contextlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    import httpx  # Optional: only needed for the HTTP/2 segment transport
+except ImportError:
+    httpx = None
 
 # --- Core Downloader Logic (adapted from your script) ---
 # This function is mostly the same, but instead of printing to the console,
 # it calls a logger function to update the GUI.
 
-def get_ffmpeg_path():
-    """Get the FFmpeg executable path based on the platform and environment."""
+FFMPEG_CACHE_FILENAME = "ffmpeg_cache.json"
+FFMPEG_CACHE_VERSION = 2
+
+# Segment buffering: segments stay in memory up to these limits, and spill to disk
+# beyond them
+SEGMENT_MEMORY_LIMIT = 16 * 1024 * 1024    # largest single segment kept in memory
+SEGMENT_MEMORY_BUDGET = 256 * 1024 * 1024  # total bytes of all in-memory segments
+SEGMENT_SPILL_BUFFER_SIZE = 1024 * 1024    # write/read buffer for spilled segments
+SEGMENT_CHUNK_SIZE = 64 * 1024             # network read size per segment
+
+# Segment fetching: segments downloaded concurrently over HTTP/1.1 (one connection
+# each), and over HTTP/2, where they are multiplexed as streams on a few connections
+SEGMENT_WORKERS = 6
+HTTP2_MAX_STREAMS = 32
+HTTP2_MAX_CONNECTIONS = 4
+
+# Remux: concurrent FFmpeg processes for discontinuity periods, and their time limits
+REMUX_WORKERS = max(1, min(os.cpu_count() or 1, 8))
+FFMPEG_BASE_TIMEOUT = 300        # seconds allowed for any FFmpeg run
+FFMPEG_TIMEOUT_PER_SEGMENT = 2   # extra seconds per segment, so long videos finish
+
+# Preflight: how many segments to sample for a size estimate, and the free-space margin
+SIZE_SAMPLE_COUNT = 12
+SIZE_SAMPLE_WORKERS = 6
+DISK_SPACE_MARGIN = 1.1
+
+# FFmpeg path and capability probe, resolved once and reused for the life of the process
+_ffmpeg_info = None
+_ffmpeg_info_lock = threading.Lock()
+
+def discover_ffmpeg_path():
+    """Search PATH, common install locations and the app bundle for FFmpeg."""
     # First, try to find ffmpeg in the system PATH
     if platform.system() == "Windows":
         ffmpeg_names = ["ffmpeg.exe", "ffmpeg"]
@@ -104,7 +144,971 @@ def get_temp_directory():
             os.makedirs(temp_dir, exist_ok=True)
         return temp_dir
 
-def download_m3u8_video(m3u8_url, output_filename, log_callback):
+def get_config_directory():
+    """Get the per-user configuration directory for the application."""
+    system = platform.system()
+    if system == "Windows":
+        base_dir = (os.environ.get("APPDATA")
+                    or os.path.join(os.path.expanduser("~"), "AppData", "Roaming"))
+    elif system == "Darwin":
+        base_dir = os.path.join(os.path.expanduser("~"), "Library",
+                                "Application Support")
+    else:  # Linux
+        base_dir = (os.environ.get("XDG_CONFIG_HOME")
+                    or os.path.join(os.path.expanduser("~"), ".config"))
+    return os.path.join(base_dir, "M3U8Downloader")
+
+def load_ffmpeg_cache():
+    """Load the FFmpeg discovery cache, starting fresh if it is missing or invalid."""
+    cache_path = os.path.join(get_config_directory(), FFMPEG_CACHE_FILENAME)
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if (cache.get("version") == FFMPEG_CACHE_VERSION
+                and isinstance(cache.get("binaries"), dict)):
+            return cache
+    except (OSError, ValueError, AttributeError):
+        pass
+    return {"version": FFMPEG_CACHE_VERSION, "binaries": {}}
+
+def save_ffmpeg_cache(cache):
+    """Write the FFmpeg discovery cache. On failure we just probe again next launch."""
+    config_dir = get_config_directory()
+    temp_path = None
+    try:
+        os.makedirs(config_dir, exist_ok=True)
+        # Write to a sibling file first so a crash never leaves a half-written cache
+        fd, temp_path = tempfile.mkstemp(prefix=".ffmpeg_cache_", dir=config_dir)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, indent=2)
+        os.replace(temp_path, os.path.join(config_dir, FFMPEG_CACHE_FILENAME))
+    except OSError:
+        if temp_path and os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+def is_ffmpeg_cache_entry_current(entry, ffmpeg_path):
+    """Check that a cached probe still matches the binary on disk (same mtime, size)."""
+    if not entry:
+        return False
+    try:
+        stat_result = os.stat(ffmpeg_path)
+    except OSError:
+        return False
+    return (entry.get("mtime_ns") == stat_result.st_mtime_ns
+            and entry.get("size") == stat_result.st_size)
+
+def parse_ffmpeg_formats(output):
+    """
+    Parse `ffmpeg -muxers` / `ffmpeg -demuxers` output into a list of format names.
+
+    Older builds print a two-column flag table (" DE mpegts ...") after a " --" line;
+    FFmpeg 7 adds a device column (" DEd alsa ...") and a " ---" line. The width of
+    the separator gives the width of the flag column.
+    """
+    names = set()
+    flags_width = None
+    for line in output.splitlines():
+        stripped = line.strip()
+        if flags_width is None:
+            if stripped and set(stripped) == {"-"}:
+                flags_width = len(stripped)
+            continue
+
+        # Rows are printed as " <flags> <name> <description>"
+        row = line[1:] if line.startswith(" ") else line
+        flags, rest = row[:flags_width], row[flags_width:]
+        if not flags.strip() or set(flags) - set("DEd. ") or not rest[:1].isspace():
+            continue
+        fields = rest.split()
+        if fields:
+            names.update(name for name in fields[0].split(',') if name)
+    return sorted(names)
+
+def parse_ffmpeg_protocols(output):
+    """Parse `ffmpeg -protocols` output into input and output protocol lists."""
+    protocols = {"input": set(), "output": set()}
+    section = None
+    for line in output.splitlines():
+        stripped = line.strip()
+        if stripped.lower() in ("input:", "output:"):
+            section = stripped[:-1].lower()
+        elif section and stripped:
+            protocols[section].add(stripped)
+    return {key: sorted(values) for key, values in protocols.items()}
+
+def parse_ffmpeg_hwaccels(output):
+    """Parse `ffmpeg -hwaccels` output into a list of hardware acceleration methods."""
+    lines = [line.strip() for line in output.splitlines()]
+    return [line for line in lines if line and not line.endswith(':')]
+
+def run_ffmpeg_query(ffmpeg_path, option):
+    """Run a single FFmpeg listing option and return its stdout (empty on failure)."""
+    try:
+        result = subprocess.run([ffmpeg_path, '-hide_banner', option],
+                                capture_output=True, text=True, encoding='utf-8',
+                                errors='ignore', timeout=10)
+    except (subprocess.SubprocessError, OSError):
+        return ""
+    return result.stdout if result.returncode == 0 else ""
+
+def probe_ffmpeg(ffmpeg_path):
+    """
+    Run FFmpeg to record its version and the capabilities the remux stage relies on.
+
+    Raises:
+        RuntimeError: If FFmpeg runs but reports an error.
+        subprocess.TimeoutExpired, FileNotFoundError: If FFmpeg cannot be executed.
+    """
+    result = subprocess.run([ffmpeg_path, '-version'],
+                            capture_output=True, text=True, timeout=10)
+    if result.returncode != 0:
+        raise RuntimeError(f"FFmpeg found but returned error: {result.stderr}")
+
+    version_line = result.stdout.split('\n')[0]
+    version_match = re.match(r"ffmpeg version (\S+)", version_line)
+    stat_result = os.stat(ffmpeg_path)
+
+    return {
+        "path": ffmpeg_path,
+        "mtime_ns": stat_result.st_mtime_ns,
+        "size": stat_result.st_size,
+        "version_line": version_line,
+        "version": version_match.group(1) if version_match else None,
+        "muxers": parse_ffmpeg_formats(run_ffmpeg_query(ffmpeg_path, '-muxers')),
+        "demuxers": parse_ffmpeg_formats(run_ffmpeg_query(ffmpeg_path, '-demuxers')),
+        "protocols": parse_ffmpeg_protocols(
+            run_ffmpeg_query(ffmpeg_path, '-protocols')),
+        "hwaccels": parse_ffmpeg_hwaccels(run_ffmpeg_query(ffmpeg_path, '-hwaccels')),
+    }
+
+def get_ffmpeg_info():
+    """
+    Get the FFmpeg path and capability probe, using the per-user cache when possible.
+
+    FFmpeg is located on every call (PATH lookups and stat calls only, no subprocess),
+    so a newly installed binary is picked up. The cache, keyed by binary path plus mtime
+    and size, only saves re-running the probe. The result is kept for the life of the
+    process.
+
+    Returns:
+        dict: The probe result, or None if FFmpeg could not be found.
+    """
+    global _ffmpeg_info
+    with _ffmpeg_info_lock:
+        if _ffmpeg_info is not None:
+            return _ffmpeg_info
+
+        ffmpeg_path = discover_ffmpeg_path()
+        if not ffmpeg_path:
+            return None
+
+        cache = load_ffmpeg_cache()
+        entry = cache["binaries"].get(ffmpeg_path)
+        if not is_ffmpeg_cache_entry_current(entry, ffmpeg_path):
+            entry = probe_ffmpeg(ffmpeg_path)
+            # Don't persist a probe whose listings could not be read; retry next launch
+            if entry["demuxers"] and entry["muxers"]:
+                cache["binaries"][ffmpeg_path] = entry
+                save_ffmpeg_cache(cache)
+
+        _ffmpeg_info = entry
+        return entry
+
+def get_ffmpeg_path():
+    """Get the FFmpeg executable path based on the platform and environment."""
+    ffmpeg_info = get_ffmpeg_info()
+    return ffmpeg_info["path"] if ffmpeg_info else None
+
+MPEGTS_EXTENSIONS = ('.ts', '.m2ts', '.mts')
+MPEGTS_SYNC_BYTE = 0x47
+
+def get_segment_extension(segment):
+    """Return the lowercase file extension of a segment URI, ignoring any query."""
+    return os.path.splitext(urlparse(segment.uri or "").path)[1].lower()
+
+def playlist_may_be_mpegts(media_playlist):
+    """
+    Check whether a media playlist's segments can be MPEG-TS.
+
+    Playlists with EXT-X-MAP (fragmented MP4) or segment URIs with another extension
+    (packed .aac/.mp3 audio, .m4s, ...) are not. URIs without an extension are
+    allowed here; their content is checked before remuxing.
+    """
+    if media_playlist.segment_map:
+        return False
+    for segment in media_playlist.segments:
+        extension = get_segment_extension(segment)
+        if extension and extension not in MPEGTS_EXTENSIONS:
+            return False
+    return True
+
+def playlist_is_mpegts_by_name(media_playlist):
+    """
+    Check whether every segment URI of a media playlist has an MPEG-TS extension.
+
+    Unlike playlist_may_be_mpegts(), URIs without an extension do not count: their
+    segments may still turn out not to be MPEG-TS once downloaded.
+    """
+    if media_playlist.segment_map:
+        return False
+    return all(get_segment_extension(segment) in MPEGTS_EXTENSIONS
+               for segment in media_playlist.segments)
+
+def select_remux_strategy(ffmpeg_info, mpegts=True):
+    """
+    Pick how segments are handed to FFmpeg, based on what the probed build supports.
+
+    Args:
+        ffmpeg_info (dict): The FFmpeg probe result.
+        mpegts (bool): Whether the segments may be MPEG-TS. Only MPEG-TS can be
+            joined byte-wise through a pipe; anything else needs the concat demuxer,
+            which detects the format of each file.
+
+    Returns:
+        str: "pipe", "concat_demuxer" or "concat_protocol", or None if none works.
+    """
+    demuxers = set(ffmpeg_info.get("demuxers") or [])
+    input_protocols = set((ffmpeg_info.get("protocols") or {}).get("input") or [])
+
+    # If the build could not list its capabilities, assume the usual concat demuxer
+    if not demuxers or not input_protocols:
+        return "concat_demuxer"
+    # Streaming into stdin lets in-memory segments reach FFmpeg without touching disk
+    if mpegts and "pipe" in input_protocols and "mpegts" in demuxers:
+        return "pipe"
+    if "concat" in demuxers and "file" in input_protocols:
+        return "concat_demuxer"
+    if "concat" in input_protocols and "mpegts" in demuxers:
+        return "concat_protocol"
+    return None
+
+def build_remux_command(ffmpeg_path, strategy, segment_store, indexes, temp_dir,
+                        output_filename, output_args=(), list_name="filelist.txt"):
+    """
+    Build the FFmpeg command that joins the stored segments using the given strategy.
+
+    Args:
+        output_args (tuple): Extra FFmpeg output options, e.g. to force a container.
+        list_name (str): File name for the concat list, unique per concurrent remux.
+    """
+    output = ['-c', 'copy', *output_args, '-y', output_filename]
+    if strategy == "pipe":
+        # Segments are written to stdin by run_ffmpeg(); MPEG-TS can be joined byte-wise
+        return [ffmpeg_path, '-f', 'mpegts', '-i', 'pipe:0', *output]
+
+    segment_filenames = [segment_store.path_for(i) for i in indexes]
+    if strategy == "concat_protocol":
+        concat_input = "concat:" + "|".join(os.path.abspath(f)
+                                            for f in segment_filenames)
+        return [ffmpeg_path, '-i', concat_input, *output]
+
+    filelist_path = write_concat_list(os.path.join(temp_dir, list_name),
+                                      segment_filenames)
+    return [ffmpeg_path, '-f', 'concat', '-safe', '0', '-i', filelist_path, *output]
+
+def write_concat_list(filelist_path, filenames):
+    """Write an FFmpeg concat demuxer list file and return its path."""
+    with open(filelist_path, 'w', encoding='utf-8') as f:
+        for filename in filenames:
+            f.write(f"file '{os.path.abspath(filename)}'\n")
+    return filelist_path
+
+def get_remux_timeout(segment_count):
+    """Return the FFmpeg time limit for remuxing `segment_count` segments."""
+    return FFMPEG_BASE_TIMEOUT + FFMPEG_TIMEOUT_PER_SEGMENT * segment_count
+
+def split_periods(segments):
+    """
+    Split a playlist's segments into periods at each EXT-X-DISCONTINUITY.
+
+    Returns:
+        list: One list of segment indexes per period, in playlist order.
+    """
+    periods = []
+    for i, segment in enumerate(segments):
+        if not periods or segment.discontinuity:
+            periods.append([])
+        periods[-1].append(i)
+    return periods
+
+def can_join_periods(ffmpeg_info):
+    """Check whether remuxed periods can be stitched with the concat demuxer."""
+    demuxers = ffmpeg_info.get("demuxers")
+    # As in select_remux_strategy(), assume the usual build if capabilities are unknown
+    return not demuxers or "concat" in demuxers
+
+def remux_segments(ffmpeg_path, strategy, segment_store, indexes, temp_dir,
+                   output_filename, output_args=(), list_name="filelist.txt",
+                   fallback_strategy="concat_demuxer"):
+    """
+    Remux a run of stored segments into one file, then release them from the store.
+
+    Args:
+        fallback_strategy (str): Used instead of "pipe" if the segments turn out not
+            to be MPEG-TS.
+
+    Returns:
+        subprocess.CompletedProcess: The finished FFmpeg run.
+    """
+    try:
+        if strategy == "pipe" and not all(segment_store.looks_like_mpegts(i)
+                                          for i in indexes):
+            strategy = fallback_strategy
+        ffmpeg_command = build_remux_command(ffmpeg_path, strategy, segment_store,
+                                             indexes, temp_dir, output_filename,
+                                             output_args, list_name)
+        input_chunks = None
+        if strategy == "pipe":
+            input_chunks = segment_store.iter_all_views(indexes)
+        return run_ffmpeg(ffmpeg_command, timeout=get_remux_timeout(len(indexes)),
+                          input_chunks=input_chunks)
+    finally:
+        # Free the memory budget (or temp space) for segments still downloading
+        for i in indexes:
+            segment_store.release(i)
+
+def run_ffmpeg(ffmpeg_command, timeout, input_chunks=None):
+    """
+    Run FFmpeg, optionally streaming bytes-like chunks (e.g. memoryviews) to its stdin.
+
+    Returns:
+        subprocess.CompletedProcess: With returncode and decoded stderr.
+
+    Raises:
+        subprocess.TimeoutExpired: If FFmpeg does not finish within `timeout` seconds.
+    """
+    if input_chunks is None:
+        return subprocess.run(ffmpeg_command, capture_output=True, text=True,
+                              encoding='utf-8', errors='ignore', timeout=timeout)
+
+    # stderr goes to a file, so a chatty FFmpeg never blocks on a full pipe as we write
+    with tempfile.TemporaryFile() as stderr_file:
+        process = subprocess.Popen(ffmpeg_command, stdin=subprocess.PIPE,
+                                   stdout=subprocess.DEVNULL, stderr=stderr_file)
+        timed_out = threading.Event()
+
+        def kill_on_timeout():
+            timed_out.set()
+            process.kill()
+
+        timer = threading.Timer(timeout, kill_on_timeout)
+        timer.start()
+        try:
+            try:
+                for chunk in input_chunks:
+                    process.stdin.write(chunk)
+                process.stdin.close()
+            except (BrokenPipeError, OSError):
+                # FFmpeg exited early; its return code and stderr explain why
+                pass
+            process.wait()
+        finally:
+            timer.cancel()
+        if timed_out.is_set():
+            raise subprocess.TimeoutExpired(ffmpeg_command, timeout)
+
+        stderr_file.seek(0)
+        stderr = stderr_file.read().decode('utf-8', errors='ignore')
+    return subprocess.CompletedProcess(ffmpeg_command, process.returncode,
+                                       stdout=None, stderr=stderr)
+
+def get_content_length(response):
+    """Return the body size announced by an HTTP response, or None if unknown."""
+    # A compressed body's Content-Length says nothing about the decoded size
+    if response.headers.get('Content-Encoding'):
+        return None
+    try:
+        return int(response.headers['Content-Length'])
+    except (KeyError, ValueError):
+        return None
+
+def get_peak_rss_bytes():
+    """Return this process's peak resident set size in bytes, or None if unknown."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return peak_rss if platform.system() == "Darwin" else peak_rss * 1024
+
+def format_bytes(num_bytes):
+    """Format a byte count for the log, e.g. 1536 -> '1.5 KB'."""
+    size = float(num_bytes)
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.1f} {unit}" if unit != "B" else f"{int(size)} B"
+        size /= 1024
+
+
+# --- Segment Storage ---
+# Downloaded segments are kept in memory while they fit in the budget and spilled to
+# disk otherwise. Backends share a small interface so the store can mix them freely.
+
+class MemorySegmentBackend:
+    """Keeps whole segments in memory."""
+
+    name = "memory"
+
+    def __init__(self):
+        self._segments = {}
+
+    def save(self, index, data):
+        self._segments[index] = data
+
+    def size(self, index):
+        return len(self._segments[index])
+
+    def iter_views(self, index):
+        """Yield the segment as a single memoryview, without copying it."""
+        yield memoryview(self._segments[index])
+
+    def release(self, index):
+        self._segments.pop(index, None)
+
+
+class DiskSegmentBackend:
+    """Stores segments as files with large buffered writes, preallocated if possible."""
+
+    name = "disk"
+
+    def __init__(self, directory, buffer_size=SEGMENT_SPILL_BUFFER_SIZE):
+        self.directory = directory
+        self.buffer_size = buffer_size
+        self._sizes = {}
+
+    def path(self, index):
+        return os.path.join(self.directory, f"segment_{index:05d}.ts")
+
+    def save(self, index, chunks, expected_size=None):
+        """Write an iterable of bytes-like chunks to the file and return its size."""
+        written = 0
+        with open(self.path(index), 'wb', buffering=self.buffer_size) as f:
+            preallocated = False
+            if expected_size and hasattr(os, 'posix_fallocate'):
+                try:
+                    os.posix_fallocate(f.fileno(), 0, expected_size)
+                    preallocated = True
+                except OSError:
+                    pass
+            for chunk in chunks:
+                f.write(chunk)
+                written += len(chunk)
+            if preallocated:
+                f.flush()
+                f.truncate(written)
+        self._sizes[index] = written
+        return written
+
+    def size(self, index):
+        return self._sizes[index]
+
+    def iter_views(self, index):
+        """Yield the segment in buffer-sized memoryviews, each valid until the next."""
+        buffer = bytearray(self.buffer_size)
+        view = memoryview(buffer)
+        with open(self.path(index), 'rb', buffering=0) as f:
+            while True:
+                count = f.readinto(buffer)
+                if not count:
+                    break
+                yield view[:count]
+
+    def release(self, index):
+        self._sizes.pop(index, None)
+        try:
+            os.remove(self.path(index))
+        except OSError:
+            pass
+
+
+class SegmentStore:
+    """
+    Holds downloaded segments in memory up to a per-segment and total budget, spilling
+    the rest to disk.
+
+    Args:
+        temp_dir (str): Directory for segments that do not fit in memory.
+        memory_limit (int): Largest segment, in bytes, that is kept in memory.
+        memory_budget (int): Total bytes of in-memory segments across the download.
+        spill_buffer_size (int): Buffer size for reading and writing spilled segments.
+    """
+
+    def __init__(self, temp_dir, memory_limit=SEGMENT_MEMORY_LIMIT,
+                 memory_budget=SEGMENT_MEMORY_BUDGET,
+                 spill_buffer_size=SEGMENT_SPILL_BUFFER_SIZE):
+        self.memory_limit = min(memory_limit, memory_budget)
+        self.memory_budget = memory_budget
+        self.memory = MemorySegmentBackend()
+        self.disk = DiskSegmentBackend(temp_dir, spill_buffer_size)
+        self.memory_used = 0
+        self.peak_memory_used = 0
+        self.memory_count = 0
+        self.spilled_count = 0
+        self._backends = {}
+        self._lock = threading.Lock()
+
+    def _reserve(self, num_bytes):
+        with self._lock:
+            if self.memory_used + num_bytes > self.memory_budget:
+                return False
+            self.memory_used += num_bytes
+            self.peak_memory_used = max(self.peak_memory_used, self.memory_used)
+            return True
+
+    def _unreserve(self, num_bytes):
+        with self._lock:
+            self.memory_used -= num_bytes
+
+    def store(self, index, chunks, expected_size=None):
+        """
+        Consume an iterable of downloaded chunks and store them as segment `index`.
+
+        Returns:
+            int: The number of bytes stored.
+        """
+        chunks = iter(chunks)
+        buffer = bytearray()
+        reserved = 0
+        try:
+            # Keep the segment in memory while it fits both limits
+            if expected_size is None or expected_size <= self.memory_limit:
+                for chunk in chunks:
+                    needed = len(buffer) + len(chunk)
+                    if (needed > self.memory_limit
+                            or not self._reserve(needed - reserved)):
+                        buffer += chunk
+                        break
+                    reserved = needed
+                    buffer += chunk
+                else:
+                    self.memory.save(index, buffer)
+                    self._backends[index] = self.memory
+                    with self._lock:
+                        self.memory_count += 1
+                    return len(buffer)
+
+            # Too large or out of budget: spill what we have and stream the rest to disk
+            self._unreserve(reserved)
+            reserved = 0
+            size = self.disk.save(index, self._chain(buffer, chunks), expected_size)
+            buffer = None
+            self._backends[index] = self.disk
+            with self._lock:
+                self.spilled_count += 1
+            return size
+        except BaseException:
+            self._unreserve(reserved)
+            self.disk.release(index)
+            raise
+
+    @staticmethod
+    def _chain(head, chunks):
+        if head:
+            yield head
+        yield from chunks
+
+    def __contains__(self, index):
+        return index in self._backends
+
+    def size(self, index):
+        return self._backends[index].size(index)
+
+    def iter_views(self, index):
+        """Yield memoryviews over segment `index`, to be written straight to FFmpeg."""
+        return self._backends[index].iter_views(index)
+
+    def looks_like_mpegts(self, index):
+        """Check for the MPEG-TS sync byte at the start of segment `index`."""
+        for view in self.iter_views(index):
+            return len(view) > 0 and view[0] == MPEGTS_SYNC_BYTE
+        return False
+
+    def iter_all_views(self, indexes):
+        """Yield memoryviews over several segments in order."""
+        for index in indexes:
+            yield from self.iter_views(index)
+
+    def path_for(self, index):
+        """Return a file path for segment `index`, writing it out if held in memory."""
+        if self._backends[index] is self.memory:
+            size = self.memory.size(index)
+            self.disk.save(index, self.memory.iter_views(index), size)
+            self.memory.release(index)
+            self._unreserve(size)
+            self._backends[index] = self.disk
+        return self.disk.path(index)
+
+    def release(self, index):
+        """Free the memory or disk space used by segment `index`."""
+        backend = self._backends.pop(index, None)
+        if backend is self.memory:
+            self._unreserve(self.memory.size(index))
+        if backend is not None:
+            backend.release(index)
+
+    def close(self):
+        """Release every stored segment."""
+        for index in list(self._backends):
+            self.release(index)
+
+    def stats(self):
+        """Return a one-line summary of how segments were buffered, for the log."""
+        summary = (f"{self.memory_count} kept in memory, "
+                   f"{self.spilled_count} spilled to disk, "
+                   f"peak buffered {format_bytes(self.peak_memory_used)} of "
+                   f"{format_bytes(self.memory_budget)} budget")
+        peak_rss = get_peak_rss_bytes()
+        if peak_rss is not None:
+            summary += f", peak RSS {format_bytes(peak_rss)}"
+        return summary
+
+# --- Segment Transports ---
+# The segment fetcher talks to a transport rather than to `requests` directly. Each
+# transport exposes `stream(url)`, yielding (chunks, content_length), the tuple of
+# exceptions it raises for network and HTTP errors as `errors`, and the number of
+# segments it should fetch at once as `max_concurrency`.
+
+class RequestsTransport:
+    """Fetches segments with `requests` over pooled HTTP/1.1 connections (default)."""
+
+    name = "HTTP/1.1 (requests)"
+    errors = (requests.exceptions.RequestException,)
+
+    def __init__(self, max_connections=SEGMENT_WORKERS):
+        self.max_concurrency = max_connections
+        self.session = requests.Session()
+        # One keep-alive connection per concurrent download, so workers never queue
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max_connections)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.http_versions = set()
+
+    @contextlib.contextmanager
+    def stream(self, url, timeout=10):
+        response = self.session.get(url, timeout=timeout, stream=True)
+        try:
+            response.raise_for_status()
+            self.http_versions.add("HTTP/1.0" if response.raw.version == 10
+                                   else "HTTP/1.1")
+            chunks = response.iter_content(chunk_size=SEGMENT_CHUNK_SIZE)
+            yield chunks, get_content_length(response)
+        finally:
+            response.close()
+
+    def close(self):
+        self.session.close()
+
+
+class Http2Transport:
+    """
+    Fetches segments with `httpx` over HTTP/2, multiplexing many concurrent segment
+    streams over a few connections per origin.
+
+    HTTP/2 is negotiated via TLS, so it applies to https:// URLs; other servers are
+    served over HTTP/1.1 on the same few connections. Each HTTP/2 stream is
+    flow-controlled on its own: window updates are only sent as a segment's body is
+    consumed, so a slow consumer throttles just that stream.
+
+    Args:
+        max_streams (int): Maximum number of concurrent segment streams.
+        max_connections (int): Maximum number of connections in the pool.
+    """
+
+    name = "HTTP/2 (httpx)"
+    errors = (httpx.HTTPError, httpx.StreamError) if httpx else ()
+
+    def __init__(self, max_streams=HTTP2_MAX_STREAMS,
+                 max_connections=HTTP2_MAX_CONNECTIONS):
+        if httpx is None:
+            raise RuntimeError(
+                "the HTTP/2 transport needs httpx: pip install 'httpx[http2]'")
+        self.max_concurrency = max_streams
+        try:
+            # New streams reuse an established HTTP/2 connection until the server's
+            # stream limit is reached, and only then open another
+            self.client = httpx.Client(
+                http2=True,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=max_connections,
+                                    max_keepalive_connections=max_connections),
+            )
+        except ImportError:
+            # httpx raises this when the `h2` package is missing
+            raise RuntimeError(
+                "the HTTP/2 transport needs h2: pip install 'httpx[http2]'")
+        self.http_versions = set()
+
+    @contextlib.contextmanager
+    def stream(self, url, timeout=10):
+        # Streams may queue for a connection (e.g. on HTTP/1.1 fallback), so don't
+        # time out waiting for the pool
+        timeout = httpx.Timeout(timeout, pool=None)
+        with self.client.stream("GET", url, timeout=timeout) as response:
+            response.raise_for_status()
+            self.http_versions.add(response.http_version)
+            chunks = response.iter_bytes(chunk_size=SEGMENT_CHUNK_SIZE)
+            yield chunks, get_content_length(response)
+
+    def close(self):
+        self.client.close()
+
+
+TRANSPORTS = {
+    "http1": RequestsTransport,
+    "http2": Http2Transport,
+}
+
+def create_transport(name, log_callback):
+    """Create the named segment transport, falling back to HTTP/1.1 if unavailable."""
+    try:
+        return TRANSPORTS[name]()
+    except KeyError:
+        log_callback(f"Warning: Unknown transport '{name}', using HTTP/1.1.")
+    except RuntimeError as e:
+        log_callback(f"Warning: HTTP/2 unavailable ({e}), using HTTP/1.1.")
+    return RequestsTransport()
+
+
+# --- Preflight ---
+# Before downloading, estimate the total size so we can check free disk space up front
+# and report a byte-based ETA while segments arrive.
+
+def format_segment_numbers(indexes, limit=20):
+    """Format zero-based segment indexes as 1-based numbers for the log: '2, 5, 9'."""
+    numbers = [str(i + 1) for i in sorted(indexes)]
+    if len(numbers) > limit:
+        return ", ".join(numbers[:limit]) + f" and {len(numbers) - limit} more"
+    return ", ".join(numbers)
+
+def format_duration(seconds):
+    """Format seconds as M:SS or H:MM:SS for the log."""
+    seconds = int(max(0, seconds))
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+def fetch_segment_size(segment_url):
+    """
+    Ask the server for a segment's size without downloading it.
+
+    Tries a HEAD request first and falls back to a one-byte Range request, whose
+    Content-Range header carries the full size. Returns None if neither works.
+    """
+    try:
+        response = requests.head(segment_url, timeout=10, allow_redirects=True)
+        if response.ok:
+            size = get_content_length(response)
+            if size:
+                return size
+
+        response = requests.get(segment_url, timeout=10, stream=True,
+                                headers={'Range': 'bytes=0-0'})
+        try:
+            # e.g. "Content-Range: bytes 0-0/1048576"
+            match = re.search(r"/(\d+)\s*$", response.headers.get('Content-Range', ''))
+            if response.status_code == 206 and match:
+                return int(match.group(1))
+        finally:
+            response.close()
+    except requests.exceptions.RequestException:
+        pass
+    return None
+
+def estimate_download_size(media_playlist, stream_info=None):
+    """
+    Estimate the total number of bytes a media playlist will download.
+
+    In order of preference: AVERAGE-BANDWIDTH x duration, sizes sampled with parallel
+    HEAD/Range requests, and finally peak BANDWIDTH x duration.
+
+    Args:
+        media_playlist (m3u8.M3U8): The media playlist to download.
+        stream_info: The variant's stream info, if the playlist came from a master
+            playlist.
+
+    Returns:
+        tuple: (estimated bytes, method name), or (None, None) if there is no estimate.
+    """
+    segments = media_playlist.segments
+    if not segments:
+        return None, None
+
+    total_duration = sum(segment.duration or 0 for segment in segments)
+    average_bandwidth = getattr(stream_info, 'average_bandwidth', None)
+    if average_bandwidth and total_duration:
+        return int(average_bandwidth / 8 * total_duration), "average bandwidth"
+
+    # Sample segments spread evenly across the playlist
+    sample_count = min(SIZE_SAMPLE_COUNT, len(segments))
+    step = len(segments) / sample_count
+    samples = [segments[int(k * step)] for k in range(sample_count)]
+    sample_urls = [seg.absolute_uri for seg in samples]
+    workers = min(SIZE_SAMPLE_WORKERS, sample_count)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        sizes = list(executor.map(fetch_segment_size, sample_urls))
+
+    measured = [(size, seg.duration or 0) for size, seg in zip(sizes, samples) if size]
+    if measured:
+        sampled_bytes = sum(size for size, _ in measured)
+        sampled_duration = sum(duration for _, duration in measured)
+        if sampled_duration and total_duration:
+            estimate = sampled_bytes / sampled_duration * total_duration
+        else:
+            estimate = sampled_bytes / len(measured) * len(segments)
+        return int(estimate), "sampled segments"
+
+    bandwidth = getattr(stream_info, 'bandwidth', None)
+    if bandwidth and total_duration:
+        return int(bandwidth / 8 * total_duration), "peak bandwidth"
+    return None, None
+
+def estimate_temp_bytes(estimated_bytes, segments, periods, strategy, split_remux):
+    """
+    Estimate the peak number of bytes the download writes to the temporary directory.
+
+    Segments are released as soon as their period is remuxed, so at most one period's
+    segments are on disk at once (and with the pipe strategy only the part that does
+    not fit in the memory budget). When periods are remuxed separately, the period
+    files all stay in the temporary directory until the final join.
+    """
+    total_duration = sum(segment.duration or 0 for segment in segments)
+    if split_remux and total_duration:
+        largest_duration = max(sum(segments[i].duration or 0 for i in period)
+                               for period in periods)
+        largest_share = largest_duration / total_duration
+    elif split_remux:
+        largest_share = max(len(period) for period in periods) / len(segments)
+    else:
+        largest_share = 1.0
+
+    segment_bytes = int(estimated_bytes * largest_share)
+    if strategy == "pipe":
+        # Piped segments only reach the temp volume once the memory budget is used up
+        segment_bytes = max(0, segment_bytes - SEGMENT_MEMORY_BUDGET)
+
+    period_bytes = estimated_bytes if split_remux else 0
+    return period_bytes + segment_bytes
+
+def check_disk_space(temp_dir, output_filename, estimated_bytes, temp_bytes, strict,
+                     log_callback):
+    """
+    Check that the temporary and output volumes can hold the download.
+
+    Args:
+        temp_dir (str): The temporary directory for spilled segments.
+        output_filename (str): The final video path.
+        estimated_bytes (int): Estimated size of the finished video.
+        temp_bytes (int): Estimated bytes to be written to the temporary directory.
+        strict (bool): Refuse when space is short; otherwise only warn (for rough
+            estimates).
+        log_callback (function): A function to call for logging messages to the GUI.
+
+    Returns:
+        bool: False if the download should not start.
+    """
+    output_dir = os.path.dirname(os.path.abspath(output_filename))
+    needs = {temp_dir: temp_bytes, output_dir: estimated_bytes}
+    try:
+        # Both directories may live on the same volume, in which case the needs add up
+        if os.stat(temp_dir).st_dev == os.stat(output_dir).st_dev:
+            needs = {output_dir: temp_bytes + estimated_bytes}
+    except OSError:
+        pass
+
+    ok = True
+    for path, needed in needs.items():
+        try:
+            free = shutil.disk_usage(path).free
+        except OSError as e:
+            log_callback(f"Warning: Could not check free space for {path}: {e}")
+            continue
+
+        if free < needed:
+            prefix = "ERROR" if strict else "WARNING"
+            log_callback(f"{prefix}: Not enough disk space on {path}: "
+                         f"need about {format_bytes(needed)}, "
+                         f"only {format_bytes(free)} free.")
+            if strict:
+                ok = False
+        elif free < needed * DISK_SPACE_MARGIN:
+            log_callback(f"WARNING: Disk space on {path} is tight: "
+                         f"need about {format_bytes(needed)}, "
+                         f"{format_bytes(free)} free.")
+    return ok
+
+
+class DownloadProgress:
+    """
+    Tracks downloaded bytes against the preflight estimate to report a byte-based ETA.
+
+    As segments arrive, the projected total moves from the estimate towards the size
+    implied by the bytes-per-second-of-video actually observed.
+    """
+
+    def __init__(self, estimated_bytes, total_duration, segment_count):
+        self.estimated_bytes = estimated_bytes
+        self.total_duration = total_duration
+        self.segment_count = segment_count
+        self.bytes_done = 0
+        self.duration_done = 0.0
+        self.segments_done = 0
+        self.start_time = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, num_bytes, duration):
+        """Record a finished segment."""
+        with self._lock:
+            self.bytes_done += num_bytes
+            self.duration_done += duration or 0
+            self.segments_done += 1
+
+    def projected_total(self):
+        """Return the current best guess of the total download size in bytes, if any."""
+        if self.total_duration and self.duration_done:
+            observed = self.bytes_done / self.duration_done * self.total_duration
+            weight = min(1.0, self.duration_done / self.total_duration)
+        elif self.segments_done:
+            observed = self.bytes_done / self.segments_done * self.segment_count
+            weight = self.segments_done / self.segment_count
+        else:
+            return self.estimated_bytes
+
+        if self.estimated_bytes:
+            projected = weight * observed + (1 - weight) * self.estimated_bytes
+        else:
+            projected = observed
+        return max(int(projected), self.bytes_done)
+
+    def eta_seconds(self):
+        """Return the estimated seconds remaining, or None until a rate is known."""
+        elapsed = time.monotonic() - self.start_time
+        total = self.projected_total()
+        if not self.bytes_done or not elapsed or total is None:
+            return None
+        rate = self.bytes_done / elapsed
+        return (total - self.bytes_done) / rate
+
+    def describe(self):
+        """Return a short progress summary for the log."""
+        total = self.projected_total()
+        if total is None:
+            return format_bytes(self.bytes_done)
+        summary = f"{format_bytes(self.bytes_done)} of ~{format_bytes(total)}"
+        eta = self.eta_seconds()
+        if eta is not None:
+            elapsed = time.monotonic() - self.start_time
+            rate = format_bytes(self.bytes_done / elapsed)
+            summary += f", {rate}/s, ETA {format_duration(eta)}"
+        return summary
+
+
+def download_m3u8_video(m3u8_url, output_filename, log_callback, transport="http1"):
     """
     Downloads a video from an M3U8 playlist.
 
@@ -112,8 +1116,11 @@ def download_m3u8_video(m3u8_url, output_filename, log_callback):
         m3u8_url (str): The URL of the M3U8 playlist.
         output_filename (str): The name of the output video file.
         log_callback (function): A function to call for logging messages to the GUI.
+        transport (str): Segment transport, "http1" (requests) or "http2" (httpx).
     """
     temp_dir = None
+    segment_store = None
+    segment_transport = None
     try:
         log_callback("Fetching the M3U8 playlist...")
         response = requests.get(m3u8_url, timeout=15)
@@ -121,6 +1128,7 @@ def download_m3u8_video(m3u8_url, output_filename, log_callback):
         playlist = m3u8.loads(response.text, uri=m3u8_url)
 
         media_playlist = playlist
+        stream_info = None
         if playlist.is_variant:
             log_callback("Variant playlist detected. Selecting the highest resolution stream.")
             sorted_playlists = sorted(
@@ -133,45 +1141,21 @@ def download_m3u8_video(m3u8_url, output_filename, log_callback):
                 return
             
             media_playlist_url = sorted_playlists[0].absolute_uri
+            stream_info = sorted_playlists[0].stream_info
             log_callback(f"Selected stream URL: {media_playlist_url}")
             
             response = requests.get(media_playlist_url)
             response.raise_for_status()
             media_playlist = m3u8.loads(response.text, uri=media_playlist_url)
 
-        # Use a proper temporary directory
-        temp_dir = get_temp_directory()
-        log_callback(f"Using temporary directory: {temp_dir}")
-
-        log_callback(f"Found {len(media_playlist.segments)} video segments.")
-        segment_filenames = []
-        for i, segment in enumerate(media_playlist.segments):
-            segment_url = segment.absolute_uri
-            segment_filename = os.path.join(temp_dir, f"segment_{i:05d}.ts")
-            segment_filenames.append(segment_filename)
-
-            log_callback(f"Downloading segment {i+1}/{len(media_playlist.segments)}...")
-            try:
-                segment_response = requests.get(segment_url, timeout=10, stream=True)
-                segment_response.raise_for_status()
-                with open(segment_filename, 'wb') as f:
-                    for chunk in segment_response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-            except requests.exceptions.RequestException as e:
-                log_callback(f"Error downloading segment {i+1}: {e}")
-                continue
-
-        log_callback("All segments downloaded. Combining into a single file using FFmpeg...")
-        
-        filelist_path = os.path.join(temp_dir, "filelist.txt")
-        with open(filelist_path, 'w', encoding='utf-8') as f:
-            for seg_file in segment_filenames:
-                f.write(f"file '{os.path.abspath(seg_file)}'\n")
-
-        # Get the appropriate FFmpeg path
-        ffmpeg_path = get_ffmpeg_path()
+        # Get the cached FFmpeg path and capabilities (probed once per binary)
+        try:
+            ffmpeg_info = get_ffmpeg_info()
+        except (subprocess.SubprocessError, OSError, RuntimeError) as e:
+            log_callback(f"ERROR: FFmpeg could not be started: {e}")
+            return
         
-        if not ffmpeg_path:
+        if not ffmpeg_info:
             log_callback("ERROR: FFmpeg not found!")
             log_callback("Please install FFmpeg:")
             log_callback("1. Download from: https://ffmpeg.org/download.html")
@@ -183,20 +1167,215 @@ def download_m3u8_video(m3u8_url, output_filename, log_callback):
             log_callback("4. Restart the application after installation")
             return
         
-        log_callback(f"Using FFmpeg: {ffmpeg_path}")
-        
-        ffmpeg_command = [
-            ffmpeg_path, '-f', 'concat', '-safe', '0', '-i', filelist_path,
-            '-c', 'copy', '-y', output_filename
-        ]
+        ffmpeg_path = ffmpeg_info["path"]
+        mpegts = playlist_may_be_mpegts(media_playlist)
+        strategy = select_remux_strategy(ffmpeg_info, mpegts)
+        fallback_strategy = select_remux_strategy(ffmpeg_info, mpegts=False)
+        if strategy is None:
+            log_callback("ERROR: This FFmpeg build supports neither the concat demuxer "
+                         "nor the concat protocol.")
+            log_callback(f"FFmpeg version: {ffmpeg_info.get('version') or 'unknown'}")
+            log_callback("Please install a full FFmpeg build.")
+            return
+
+        log_callback(f"Using FFmpeg: {ffmpeg_path} ({strategy})")
+
+        # Use a proper temporary directory
+        temp_dir = get_temp_directory()
+        log_callback(f"Using temporary directory: {temp_dir}")
+
+        segments = media_playlist.segments
+        log_callback(f"Found {len(segments)} video segments.")
+
+        # Remux each discontinuity period separately when there is more than one
+        periods = split_periods(segments)
+        split_remux = len(periods) > 1 and can_join_periods(ffmpeg_info)
+        if not split_remux:
+            periods = [list(range(len(segments)))]
+
+        # Preflight: estimate the download size and make sure it fits on disk
+        estimated_bytes, method = estimate_download_size(media_playlist, stream_info)
+        if estimated_bytes:
+            log_callback(f"Estimated download size: {format_bytes(estimated_bytes)} "
+                         f"(from {method})")
+            # Segments without an extension may not be MPEG-TS after all; those are
+            # remuxed from temporary files, so size the check for the fallback then
+            temp_strategy = strategy
+            if strategy == "pipe" and not playlist_is_mpegts_by_name(media_playlist):
+                temp_strategy = fallback_strategy or strategy
+            temp_bytes = estimate_temp_bytes(estimated_bytes, segments, periods,
+                                             temp_strategy, split_remux)
+            # Peak BANDWIDTH overstates the size, so only warn on that estimate
+            strict = method != "peak bandwidth"
+            if not check_disk_space(temp_dir, output_filename, estimated_bytes,
+                                    temp_bytes, strict, log_callback):
+                log_callback("Download cancelled: free up disk space or choose another "
+                             "location.")
+                return
+        else:
+            log_callback("Could not estimate the download size; skipping the disk "
+                         "space check.")
+
+        total_duration = sum(segment.duration or 0 for segment in segments)
+        progress = DownloadProgress(estimated_bytes, total_duration, len(segments))
+        segment_store = SegmentStore(temp_dir)
+        segment_transport = create_transport(transport, log_callback)
+        log_callback(f"Downloading segments over {segment_transport.name}, "
+                     f"{segment_transport.max_concurrency} at a time...")
+        if split_remux:
+            log_callback(f"Found {len(periods)} discontinuity periods; each is remuxed "
+                         f"as soon as it finishes downloading, "
+                         f"{REMUX_WORKERS} at a time.")
+
+        period_of_segment = {i: p for p, indexes in enumerate(periods) for i in indexes}
+        pending_counts = [len(indexes) for indexes in periods]
+        stored_by_period = [[] for _ in periods]
+        period_outputs = {}
+        remux_futures = {}
+        failed_segments = []
+        period_lock = threading.Lock()
+        # Set when the job cannot succeed any more. Downloads and remuxes that have not
+        # started yet are skipped; FFmpeg runs already in progress finish on their own.
+        abort = threading.Event()
+
+        def abort_on_failure(future):
+            if future.cancelled():
+                return
+            result = None if future.exception() else future.result()
+            if future.exception() or (result and result.returncode != 0):
+                abort.set()
+                for pending in list(remux_futures.values()):
+                    pending.cancel()
+
+        def remux_unless_aborted(*args, **kwargs):
+            """Run remux_segments(), or return None if the job was aborted meanwhile."""
+            if abort.is_set():
+                return None
+            return remux_segments(*args, **kwargs)
+
+        def start_period_remux(p):
+            """Hand a fully downloaded period to the FFmpeg pool."""
+            if abort.is_set():
+                return
+            indexes = sorted(stored_by_period[p])
+            if not indexes:
+                log_callback(f"Warning: No segments of period {p+1} were downloaded; "
+                             f"skipping it.")
+                return
+            if split_remux:
+                # Each period becomes MPEG-TS starting at zero; the join lines them up
+                period_outputs[p] = os.path.join(temp_dir, f"period_{p:04d}.ts")
+                log_callback(f"Remuxing period {p+1}/{len(periods)} "
+                             f"({len(indexes)} segments)...")
+                remux_futures[p] = remux_executor.submit(
+                    remux_unless_aborted, ffmpeg_path, strategy, segment_store, indexes,
+                    temp_dir, period_outputs[p],
+                    ('-avoid_negative_ts', 'make_zero', '-f', 'mpegts'),
+                    f"filelist_{p:04d}.txt", fallback_strategy or strategy)
+            else:
+                remux_futures[p] = remux_executor.submit(
+                    remux_unless_aborted, ffmpeg_path, strategy, segment_store, indexes,
+                    temp_dir, output_filename,
+                    fallback_strategy=fallback_strategy or strategy)
+            remux_futures[p].add_done_callback(abort_on_failure)
+
+        def fetch_segment(i):
+            """Download segment `i` into the store; remux its period once complete."""
+            if abort.is_set():
+                return
+            segment = segments[i]
+            ok = True
+            try:
+                with segment_transport.stream(segment.absolute_uri) as (chunks, length):
+                    size = segment_store.store(i, chunks, length)
+                progress.add(size, segment.duration)
+                log_callback(f"Downloaded segment {i+1}/{len(segments)} "
+                             f"({progress.describe()})")
+            except segment_transport.errors as e:
+                log_callback(f"Error downloading segment {i+1}: {e}")
+                ok = False
+            except Exception:
+                # Not a network error (e.g. a full disk while spilling): stop the job
+                abort.set()
+                raise
+
+            p = period_of_segment[i]
+            with period_lock:
+                if ok:
+                    stored_by_period[p].append(i)
+                else:
+                    failed_segments.append(i)
+                pending_counts[p] -= 1
+                if pending_counts[p] == 0:
+                    start_period_remux(p)
+
+        with ThreadPoolExecutor(max_workers=REMUX_WORKERS) as remux_executor:
+            fetch_workers = segment_transport.max_concurrency
+            with ThreadPoolExecutor(max_workers=fetch_workers) as executor:
+                fetch_futures = [executor.submit(fetch_segment, i)
+                                 for i in range(len(segments))]
+                try:
+                    for future in as_completed(fetch_futures):
+                        future.result()
+                except BaseException:
+                    # Fail without waiting for the other downloads or queued remuxes
+                    abort.set()
+                    for future in fetch_futures + list(remux_futures.values()):
+                        future.cancel()
+                    raise
+
+            elapsed = time.monotonic() - progress.start_time
+            protocols = ", ".join(sorted(segment_transport.http_versions)) or "none"
+            log_callback(f"Downloaded {format_bytes(progress.bytes_done)} in "
+                         f"{format_duration(elapsed)} via {segment_transport.name} "
+                         f"(negotiated: {protocols}).")
+            log_callback(f"Segment buffers: {segment_store.stats()}")
+            if abort.is_set():
+                log_callback("Stopped downloading early because a remux failed.")
+            else:
+                log_callback("All segments downloaded. Combining into a single file "
+                             "using FFmpeg...")
+
+        if not remux_futures:
+            log_callback("ERROR: No segments could be downloaded.")
+            return
 
         try:
-            # Use subprocess.run to execute FFmpeg
-            result = subprocess.run(ffmpeg_command, capture_output=True, text=True, 
-                                  encoding='utf-8', errors='ignore', timeout=300)
+            # Check the period remuxes in playlist order, stopping at the first failure.
+            # Remuxes skipped after an abort have no result; the failure comes later.
+            result = None
+            for p in sorted(remux_futures):
+                future = remux_futures[p]
+                if future.cancelled() or future.result() is None:
+                    continue
+                result = future.result()
+                if result.returncode != 0:
+                    break
+
+            if result.returncode == 0 and split_remux:
+                # Lightweight join; the concat demuxer offsets each period's timestamps
+                log_callback(f"Joining {len(period_outputs)} periods...")
+                joinlist_path = write_concat_list(
+                    os.path.join(temp_dir, "periods.txt"),
+                    [period_outputs[p] for p in sorted(period_outputs)])
+                join_command = [
+                    ffmpeg_path, '-f', 'concat', '-safe', '0', '-i', joinlist_path,
+                    '-c', 'copy', '-avoid_negative_ts', 'make_zero',
+                    '-y', output_filename
+                ]
+                result = run_ffmpeg(join_command,
+                                    timeout=get_remux_timeout(len(segments)))
 
             if result.returncode == 0:
-                log_callback(f"Video saved successfully as {output_filename}")
+                if failed_segments:
+                    # The video has gaps; say so instead of reporting success
+                    log_callback(f"ERROR: {len(failed_segments)} of {len(segments)} "
+                                 f"segments could not be downloaded and are missing "
+                                 f"from the video: "
+                                 f"{format_segment_numbers(failed_segments)}")
+                    log_callback(f"Incomplete video saved as {output_filename}")
+                else:
+                    log_callback(f"Video saved successfully as {output_filename}")
             else:
                 log_callback("ERROR: FFmpeg failed to combine video segments.")
                 log_callback(f"FFmpeg stderr: {result.stderr}")
@@ -223,6 +1402,10 @@ def download_m3u8_video(m3u8_url, output_filename, log_callback):
         log_callback(f"Traceback: {traceback.format_exc()}")
     finally:
         # Clean up temp files
+        if segment_transport is not None:
+            segment_transport.close()
+        if segment_store is not None:
+            segment_store.close()
         if temp_dir and os.path.exists(temp_dir):
             try:
                 log_callback("Cleaning up temporary files...")
@@ -249,6 +1432,9 @@ class App(tk.Tk):
         style.configure("TButton", background="#4a4a4a", foreground="white", font=("Arial", 10, "bold"), borderwidth=0)
         style.map("TButton", background=[("active", "#6a6a6a")])
         style.configure("TEntry", fieldbackground="#4a4a4a", foreground="white", borderwidth=1)
+        style.configure("TCheckbutton", background="#2e2e2e", foreground="white",
+                        font=("Arial", 10))
+        style.map("TCheckbutton", background=[("active", "#2e2e2e")])
         
         # --- Widgets ---
         self.url_label = ttk.Label(self, text="M3U8 URL:")
@@ -257,6 +1443,14 @@ class App(tk.Tk):
         self.url_entry = ttk.Entry(self, width=80)
         self.url_entry.pack(pady=5, padx=10, fill="x")
 
+        self.http2_var = tk.BooleanVar(value=False)
+        self.http2_check = ttk.Checkbutton(
+            self, text="Use HTTP/2 for segments (requires httpx[http2])",
+            variable=self.http2_var)
+        self.http2_check.pack(pady=(0, 5), padx=10, anchor="w")
+        if httpx is None:
+            self.http2_check.config(state='disabled')
+
         self.download_button = ttk.Button(self, text="Download Video", command=self.start_download_thread)
         self.download_button.pack(pady=10, padx=10)
 
@@ -264,14 +1458,21 @@ class App(tk.Tk):
         self.log_area.pack(pady=10, padx=10, expand=True, fill="both")
 
         # Test FFmpeg availability on startup
-        self.after(100, self.test_ffmpeg)
+        self.after(100, self.start_ffmpeg_check)
+
+    def start_ffmpeg_check(self):
+        """Runs the FFmpeg check in a worker thread so the window stays responsive."""
+        ffmpeg_thread = threading.Thread(target=self.test_ffmpeg, daemon=True)
+        ffmpeg_thread.start()
 
     def test_ffmpeg(self):
-        """Test if FFmpeg is available and show status."""
+        """Test if FFmpeg is available and show status. Runs in a worker thread."""
         try:
-            ffmpeg_path = get_ffmpeg_path()
+            # Uses the per-user discovery cache; probing a new or changed FFmpeg runs
+            # several subprocesses, which is why this is kept off the Tk thread
+            ffmpeg_info = get_ffmpeg_info()
             
-            if not ffmpeg_path:
+            if not ffmpeg_info:
                 self.log("ERROR: FFmpeg not found!")
                 self.log("Installation options:")
                 if platform.system() == "Windows":
@@ -287,16 +1488,14 @@ class App(tk.Tk):
                     self.log("  - Fedora: sudo dnf install ffmpeg")
                 return
             
-            # Test FFmpeg execution
-            result = subprocess.run([ffmpeg_path, '-version'], 
-                                  capture_output=True, text=True, timeout=10)
-            if result.returncode == 0:
-                version_line = result.stdout.split('\n')[0]
-                self.log(f"SUCCESS: FFmpeg ready: {version_line}")
-                self.log(f"Location: {ffmpeg_path}")
-            else:
-                self.log(f"WARNING: FFmpeg found but returned error: {result.stderr}")
+            self.log(f"SUCCESS: FFmpeg ready: {ffmpeg_info['version_line']}")
+            self.log(f"Location: {ffmpeg_info['path']}")
+            if select_remux_strategy(ffmpeg_info) is None:
+                self.log("WARNING: This FFmpeg build cannot concatenate segments "
+                         "(no concat support)")
                 
+        except RuntimeError as e:
+            self.log(f"WARNING: {e}")
         except subprocess.TimeoutExpired:
             self.log("WARNING: FFmpeg test timed out")
         except FileNotFoundError:
@@ -336,6 +1535,8 @@ class App(tk.Tk):
             self.log("Download cancelled by user.")
             return
 
+        transport = "http2" if self.http2_var.get() else "http1"
+
         self.download_button.config(state='disabled', text="Downloading...")
         self.log_area.config(state='normal')
         self.log_area.delete(1.0, tk.END)  # Clear log
@@ -344,15 +1545,16 @@ class App(tk.Tk):
         # Run the download function in a new thread
         download_thread = threading.Thread(
             target=self.run_download,
-            args=(m3u8_url, output_filename),
+            args=(m3u8_url, output_filename, transport),
             daemon=True
         )
         download_thread.start()
 
-    def run_download(self, m3u8_url, output_filename):
+    def run_download(self, m3u8_url, output_filename, transport):
         """The actual function that the thread will execute."""
         try:
-            download_m3u8_video(m3u8_url, output_filename, self.log)
+            download_m3u8_video(m3u8_url, output_filename, self.log,
+                                transport=transport)
         except Exception as e:
             self.log(f"Unexpected error in download thread: {e}")
         finally:
@@ -0,0 +1,113 @@
+import contextlib
+import os
+import subprocess
+import sys
+import tempfile
+from types import SimpleNamespace
+
+import m3u8
+import pytest
+
+# app.py lives at the repository root rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+
+@pytest.fixture
+def make_playlist():
+    """Return a builder for media playlists with one `seg<N>.ts` per duration."""
+
+    def build(durations, discontinuities=(), extension=".ts"):
+        lines = ["#EXTM3U"]
+        for i, duration in enumerate(durations):
+            if i in discontinuities:
+                lines.append("#EXT-X-DISCONTINUITY")
+            lines += [f"#EXTINF:{duration},", f"seg{i}{extension}"]
+        return m3u8.loads("\n".join(lines) + "\n", uri="http://example.com/index.m3u8")
+
+    return build
+
+
+class StubTransport:
+    """Serves segment bodies from a dict keyed by file name instead of the network."""
+
+    name = "stub"
+    errors = (ConnectionError,)
+
+    def __init__(self, bodies, max_concurrency):
+        self.bodies = bodies
+        self.max_concurrency = max_concurrency
+        self.http_versions = set()
+        self.requested = []
+
+    @contextlib.contextmanager
+    def stream(self, url, timeout=10):
+        name = url.rsplit("/", 1)[-1]
+        self.requested.append(name)
+        body = self.bodies.get(name, b"\x47" * 188)
+        if isinstance(body, BaseException):
+            raise body
+        yield [body], len(body)
+
+    def close(self):
+        pass
+
+
+class OfflineDownload:
+    """Runs download_m3u8_video() against a stub transport and a recording FFmpeg."""
+
+    def __init__(self, monkeypatch, tmp_path):
+        self.tmp_path = tmp_path
+        self.bodies = {}
+        self.returncodes = {}  # FFmpeg exit code by output file name, 0 otherwise
+        self.commands = []
+        self.lists = {}  # Lines of each concat list FFmpeg was given, by file name
+        self.messages = []
+        self.transport = StubTransport(self.bodies, max_concurrency=1)
+        self.monkeypatch = monkeypatch
+
+        ffmpeg_info = {
+            "path": "ffmpeg",
+            "version": "7.0",
+            "demuxers": ["concat", "mpegts"],
+            "protocols": {"input": ["concat", "file", "pipe"], "output": ["file"]},
+        }
+        monkeypatch.setattr(app, "get_ffmpeg_info", lambda: ffmpeg_info)
+        monkeypatch.setattr(app, "fetch_segment_size", lambda url: None)
+        monkeypatch.setattr(app, "get_temp_directory", self.make_temp_directory)
+        monkeypatch.setattr(app, "create_transport", lambda name, log: self.transport)
+        monkeypatch.setattr(app, "run_ffmpeg", self.run_ffmpeg)
+
+    def make_temp_directory(self):
+        return tempfile.mkdtemp(dir=self.tmp_path)
+
+    def run_ffmpeg(self, cmd, timeout, input_chunks=None):
+        self.commands.append(cmd)
+        source = cmd[cmd.index("-i") + 1]
+        if source.endswith(".txt"):
+            with open(source, encoding="utf-8") as f:
+                self.lists[os.path.basename(source)] = f.read().splitlines()
+        for _ in input_chunks or ():
+            pass
+        returncode = self.returncodes.get(os.path.basename(cmd[-1]), 0)
+        return subprocess.CompletedProcess(cmd, returncode, stdout=None,
+                                           stderr="stub failure" if returncode else "")
+
+    def run(self, playlist, output_filename="out.mp4"):
+        """Download `playlist` (an m3u8 object) and return the log messages."""
+        response = SimpleNamespace(text=playlist.dumps(), raise_for_status=lambda: None)
+        self.monkeypatch.setattr(app.requests, "get", lambda url, **kwargs: response)
+        output_path = str(self.tmp_path / output_filename)
+        app.download_m3u8_video(playlist.base_uri + "index.m3u8", output_path,
+                                self.messages.append)
+        return self.messages
+
+    def outputs(self):
+        """The output file name of each FFmpeg run, in order."""
+        return [os.path.basename(cmd[-1]) for cmd in self.commands]
+
+
+@pytest.fixture
+def offline_download(monkeypatch, tmp_path):
+    return OfflineDownload(monkeypatch, tmp_path)
@@ -0,0 +1,123 @@
+import app
+
+
+# `ffmpeg -hide_banner -demuxers` from FFmpeg 6.0 (two flag columns, " --" separator)
+DEMUXERS_6 = """\
+File formats:
+ D. = Demuxing supported
+ .E = Muxing supported
+ --
+ D  aac             raw ADTS AAC (Advanced Audio Coding)
+ D  alsa            ALSA audio input
+ D  concat          Virtual concatenation script
+ D  mov,mp4,m4a,3gp,3g2,mj2 QuickTime / MOV
+ D  mpegts          MPEG-TS (MPEG-2 Transport Stream)
+"""
+
+# `ffmpeg -hide_banner -muxers` from FFmpeg 6.0
+MUXERS_6 = """\
+File formats:
+ D. = Demuxing supported
+ .E = Muxing supported
+ --
+  E adts            ADTS AAC (Advanced Audio Coding)
+  E mp4             MP4 (MPEG-4 Part 14)
+  E mpegts          MPEG-TS (MPEG-2 Transport Stream)
+"""
+
+# `ffmpeg -hide_banner -formats` from FFmpeg 7.0.2 (device column, " ---" separator)
+FORMATS_7 = """\
+File formats:
+ D.. = Demuxing supported
+ .E. = Muxing supported
+ ..d = Is a device
+ ---
+ D   aac             raw ADTS AAC (Advanced Audio Coding)
+  E  adts            ADTS AAC (Advanced Audio Coding)
+ DEd alsa            ALSA audio output
+ D   concat          Virtual concatenation script
+ D   mov,mp4,m4a,3gp,3g2,mj2 QuickTime / MOV
+  E  mp4             MP4 (MPEG-4 Part 14)
+ DE  mpegts          MPEG-TS (MPEG-2 Transport Stream)
+  Ed opengl          OpenGL output
+"""
+
+PROTOCOLS = """\
+Supported file protocols:
+Input:
+  concat
+  file
+  pipe
+Output:
+  file
+  pipe
+"""
+
+
+def test_parse_formats_old_style():
+    assert app.parse_ffmpeg_formats(DEMUXERS_6) == [
+        "3g2", "3gp", "aac", "alsa", "concat", "m4a", "mj2", "mov", "mp4", "mpegts",
+    ]
+    assert app.parse_ffmpeg_formats(MUXERS_6) == ["adts", "mp4", "mpegts"]
+
+
+def test_parse_formats_ffmpeg_7():
+    names = app.parse_ffmpeg_formats(FORMATS_7)
+    assert names == [
+        "3g2", "3gp", "aac", "adts", "alsa", "concat", "m4a", "mj2", "mov", "mp4",
+        "mpegts", "opengl",
+    ]
+
+
+def test_parse_formats_ignores_header_only_output():
+    assert app.parse_ffmpeg_formats("") == []
+    assert app.parse_ffmpeg_formats("File formats:\n D. = Demuxing supported\n") == []
+
+
+def test_parse_protocols():
+    assert app.parse_ffmpeg_protocols(PROTOCOLS) == {
+        "input": ["concat", "file", "pipe"],
+        "output": ["file", "pipe"],
+    }
+
+
+def test_ffmpeg_7_probe_selects_pipe():
+    info = {
+        "demuxers": app.parse_ffmpeg_formats(FORMATS_7),
+        "protocols": app.parse_ffmpeg_protocols(PROTOCOLS),
+    }
+    assert app.select_remux_strategy(info) == "pipe"
+
+
+def test_ffmpeg_info_rediscovers_and_only_reprobes_changed_binaries(tmp_path,
+                                                                    monkeypatch):
+    first = tmp_path / "first" / "ffmpeg"
+    second = tmp_path / "second" / "ffmpeg"
+    for binary in (first, second):
+        binary.parent.mkdir()
+        binary.write_bytes(b"#!/bin/sh\n")
+
+    probes = []
+
+    def fake_probe(path):
+        probes.append(path)
+        stat_result = app.os.stat(path)
+        return {"path": path, "mtime_ns": stat_result.st_mtime_ns,
+                "size": stat_result.st_size, "muxers": ["mp4"],
+                "demuxers": ["concat"], "protocols": {}}
+
+    monkeypatch.setattr(app, "get_config_directory", lambda: str(tmp_path / "config"))
+    monkeypatch.setattr(app, "probe_ffmpeg", fake_probe)
+
+    def launch(found):
+        monkeypatch.setattr(app, "_ffmpeg_info", None)
+        monkeypatch.setattr(app, "discover_ffmpeg_path", lambda: str(found))
+        return app.get_ffmpeg_info()["path"]
+
+    assert launch(first) == str(first)
+    assert launch(first) == str(first)
+    assert probes == [str(first)]
+
+    # A binary that now comes first on PATH is used, even if the old one is unchanged
+    assert launch(second) == str(second)
+    assert probes == [str(first), str(second)]
@@ -0,0 +1,84 @@
+import os
+
+import app
+
+
+def test_split_periods_without_discontinuities(make_playlist):
+    assert app.split_periods(make_playlist([4] * 3).segments) == [[0, 1, 2]]
+
+
+def test_split_periods_at_each_discontinuity(make_playlist):
+    segments = make_playlist([4] * 7, discontinuities={2, 3, 6}).segments
+    assert app.split_periods(segments) == [[0, 1], [2], [3, 4, 5], [6]]
+
+
+def test_split_periods_leading_discontinuity_does_not_add_empty_period(make_playlist):
+    segments = make_playlist([4] * 3, discontinuities={0, 2}).segments
+    assert app.split_periods(segments) == [[0, 1], [2]]
+
+
+def test_split_periods_empty_playlist():
+    assert app.split_periods([]) == []
+
+
+def test_can_join_periods():
+    assert app.can_join_periods({"demuxers": ["concat", "mpegts"]})
+    assert not app.can_join_periods({"demuxers": ["mpegts"]})
+    assert app.can_join_periods({"demuxers": []})
+
+
+def test_temp_bytes_single_period(make_playlist):
+    segments = make_playlist([4] * 4).segments
+    periods = [[0, 1, 2, 3]]
+    estimate = app.estimate_temp_bytes
+    assert estimate(1_000, segments, periods, "concat_demuxer", False) == 1_000
+    assert estimate(1_000, segments, periods, "pipe", False) == 0
+
+
+def test_temp_bytes_split_counts_period_files_and_largest_period(make_playlist):
+    segments = make_playlist([10, 10, 20, 40, 20], discontinuities={2, 3}).segments
+    periods = app.split_periods(segments)
+    # Period files (the whole estimate) plus the largest period's share (60 of 100 s)
+    estimate = app.estimate_temp_bytes
+    assert estimate(1_000, segments, periods, "concat_demuxer", True) == 1_600
+    # Piped segments of that period fit in memory
+    assert estimate(1_000, segments, periods, "pipe", True) == 1_000
+
+
+def test_temp_bytes_pipe_counts_largest_period_beyond_memory_budget(
+        make_playlist):
+    segments = make_playlist([50, 50], discontinuities={1}).segments
+    periods = app.split_periods(segments)
+    total = 4 * app.SEGMENT_MEMORY_BUDGET
+    expected = total + (total // 2 - app.SEGMENT_MEMORY_BUDGET)
+    assert app.estimate_temp_bytes(total, segments, periods, "pipe", True) == expected
+
+
+def test_download_remuxes_each_period_and_joins_them_in_order(offline_download,
+                                                              make_playlist):
+    offline_download.transport.max_concurrency = 6
+    playlist = make_playlist([4.0] * 6, discontinuities={2, 3})
+    messages = offline_download.run(playlist)
+
+    *period_commands, join_command = offline_download.commands
+    assert sorted(offline_download.outputs()[:-1]) == [
+        "period_0000.ts", "period_0001.ts", "period_0002.ts"]
+    for cmd in period_commands:
+        assert cmd[-6:-1] == ["-avoid_negative_ts", "make_zero", "-f", "mpegts", "-y"]
+
+    assert join_command[-1] == str(offline_download.tmp_path / "out.mp4")
+    assert [os.path.basename(line.split("'")[1])
+            for line in offline_download.lists["periods.txt"]] == [
+        "period_0000.ts", "period_0001.ts", "period_0002.ts"]
+    assert any(m.startswith("Video saved successfully") for m in messages)
+
+
+def test_download_fails_when_the_join_fails(offline_download, make_playlist):
+    offline_download.returncodes["out.mp4"] = 1
+    playlist = make_playlist([4.0] * 4, discontinuities={2})
+    messages = offline_download.run(playlist)
+    outputs = offline_download.outputs()
+    assert sorted(outputs[:-1]) == ["period_0000.ts", "period_0001.ts"]
+    assert outputs[-1] == "out.mp4"
+    assert "ERROR: FFmpeg failed to combine video segments." in messages
+    assert not any("saved" in m for m in messages)
@@ -0,0 +1,149 @@
+from collections import namedtuple
+from types import SimpleNamespace
+
+import pytest
+
+import app
+
+
+def test_estimate_prefers_average_bandwidth(monkeypatch, make_playlist):
+    monkeypatch.setattr(app, "fetch_segment_size", pytest.fail)
+    stream_info = SimpleNamespace(average_bandwidth=800_000, bandwidth=2_000_000)
+    playlist = make_playlist([4.0] * 10)
+    estimate, method = app.estimate_download_size(playlist, stream_info)
+    # 800 kbit/s for 40 seconds
+    assert (estimate, method) == (4_000_000, "average bandwidth")
+
+
+def test_estimate_samples_segments_and_scales_by_duration(monkeypatch, make_playlist):
+    requested = []
+
+    def fake_size(url):
+        requested.append(url)
+        return 100_000
+
+    monkeypatch.setattr(app, "fetch_segment_size", fake_size)
+    estimate, method = app.estimate_download_size(make_playlist([4.0] * 30))
+    assert method == "sampled segments"
+    assert estimate == 3_000_000
+    assert len(requested) == app.SIZE_SAMPLE_COUNT
+    # Samples are spread across the playlist, not just the first segments
+    assert requested[-1].endswith("seg27.ts")
+
+
+def test_estimate_ignores_failed_samples(monkeypatch, make_playlist):
+    sizes = iter([None, 200_000] * app.SIZE_SAMPLE_COUNT)
+    monkeypatch.setattr(app, "fetch_segment_size", lambda url: next(sizes))
+    estimate, method = app.estimate_download_size(make_playlist([4.0] * 12))
+    assert (estimate, method) == (2_400_000, "sampled segments")
+
+
+def test_estimate_falls_back_to_peak_bandwidth(monkeypatch, make_playlist):
+    monkeypatch.setattr(app, "fetch_segment_size", lambda url: None)
+    stream_info = SimpleNamespace(average_bandwidth=None, bandwidth=1_000_000)
+    estimate, method = app.estimate_download_size(make_playlist([4.0] * 5), stream_info)
+    assert (estimate, method) == (2_500_000, "peak bandwidth")
+
+
+def test_estimate_gives_up_without_information(monkeypatch, make_playlist):
+    monkeypatch.setattr(app, "fetch_segment_size", lambda url: None)
+    assert app.estimate_download_size(make_playlist([4.0] * 5)) == (None, None)
+    assert app.estimate_download_size(make_playlist([])) == (None, None)
+
+
+def test_progress_uses_estimate_before_any_segment():
+    progress = app.DownloadProgress(1_000_000, total_duration=100, segment_count=10)
+    assert progress.projected_total() == 1_000_000
+    assert progress.eta_seconds() is None
+
+
+def test_progress_moves_from_estimate_towards_observed_size():
+    progress = app.DownloadProgress(1_000_000, total_duration=100, segment_count=10)
+    # A quarter of the video has arrived at twice the estimated bitrate
+    progress.add(500_000, 25)
+    # observed 2,000,000 weighted 0.25, estimate weighted 0.75
+    assert progress.projected_total() == 1_250_000
+
+    progress.add(1_500_000, 75)
+    assert progress.projected_total() == 2_000_000
+
+
+def test_progress_without_estimate_or_durations_uses_segment_counts():
+    progress = app.DownloadProgress(None, total_duration=0, segment_count=4)
+    assert progress.projected_total() is None
+    progress.add(300, None)
+    assert progress.projected_total() == 1200
+
+
+def test_progress_never_projects_less_than_downloaded():
+    progress = app.DownloadProgress(100, total_duration=10, segment_count=2)
+    progress.add(5_000, 1)
+    assert progress.projected_total() >= 5_000
+
+
+def test_progress_eta(monkeypatch):
+    clock = iter([0.0, 10.0, 10.0])
+    monkeypatch.setattr(app.time, "monotonic", lambda: next(clock))
+    progress = app.DownloadProgress(1_000_000, total_duration=100, segment_count=10)
+    progress.add(250_000, 25)
+    # 25 KB/s with 750 KB left
+    assert progress.eta_seconds() == pytest.approx(30.0)
+
+
+DiskUsage = namedtuple("DiskUsage", "total used free")
+
+
+def test_check_disk_space_refuses_and_warns(tmp_path, monkeypatch):
+    temp_dir = tmp_path / "temp"
+    temp_dir.mkdir()
+    output = tmp_path / "out.mp4"
+    monkeypatch.setattr(app.shutil, "disk_usage", lambda path: DiskUsage(0, 0, 1_000))
+    messages = []
+
+    def check(estimated_bytes, temp_bytes, strict):
+        return app.check_disk_space(str(temp_dir), str(output), estimated_bytes,
+                                    temp_bytes, strict, messages.append)
+
+    # Same volume: temp and output needs add up
+    assert not check(600, 600, True)
+    assert messages[-1].startswith("ERROR: Not enough disk space")
+
+    assert check(600, 600, False)
+    assert messages[-1].startswith("WARNING: Not enough disk space")
+
+    assert check(500, 450, True)
+    assert messages[-1].startswith("WARNING: Disk space")
+
+    messages.clear()
+    assert check(400, 0, True)
+    assert messages == []
+
+
+@pytest.mark.parametrize("extension, in_memory", [(".ts", True), ("", False)])
+def test_temp_space_check_assumes_fallback_for_extensionless_segments(
+        offline_download, make_playlist, monkeypatch, extension, in_memory):
+    monkeypatch.setattr(app, "fetch_segment_size", lambda url: 100_000_000)
+    checks = []
+
+    def record_check(temp_dir, output, estimated_bytes, temp_bytes, strict, log):
+        checks.append((estimated_bytes, temp_bytes))
+        return False
+
+    monkeypatch.setattr(app, "check_disk_space", record_check)
+    offline_download.run(make_playlist([4.0] * 4, extension=extension))
+    [(estimated_bytes, temp_bytes)] = checks
+    # Piped segments that fit the memory budget never reach the temp volume
+    if in_memory:
+        assert temp_bytes == estimated_bytes - app.SEGMENT_MEMORY_BUDGET
+    else:
+        assert temp_bytes == estimated_bytes
+    assert offline_download.commands == []
+
+
+def test_format_helpers():
+    assert app.format_bytes(512) == "512 B"
+    assert app.format_bytes(1536) == "1.5 KB"
+    assert app.format_duration(75) == "1:15"
+    assert app.format_duration(3725) == "1:02:05"
+    assert app.format_segment_numbers([4, 1]) == "2, 5"
+    assert app.format_segment_numbers(range(25), limit=3) == "1, 2, 3 and 22 more"
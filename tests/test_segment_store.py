@@ -0,0 +1,144 @@
+import m3u8
+import pytest
+
+import app
+
+
+def make_store(tmp_path, memory_limit=100, memory_budget=250):
+    return app.SegmentStore(str(tmp_path), memory_limit=memory_limit,
+                            memory_budget=memory_budget, spill_buffer_size=16)
+
+
+def read_segment(store, index):
+    return b"".join(bytes(view) for view in store.iter_views(index))
+
+
+def backend_name(store, index):
+    return store._backends[index].name
+
+
+def test_small_segments_stay_in_memory(tmp_path):
+    store = make_store(tmp_path)
+    assert store.store(0, [b"a" * 50, b"b" * 40], expected_size=90) == 90
+    assert backend_name(store, 0) == "memory"
+    assert store.memory_used == 90
+    assert read_segment(store, 0) == b"a" * 50 + b"b" * 40
+    assert not (tmp_path / "segment_00000.ts").exists()
+
+
+def test_segment_over_limit_spills_to_disk(tmp_path):
+    store = make_store(tmp_path)
+    assert store.store(0, [b"c" * 60, b"d" * 60]) == 120
+    assert backend_name(store, 0) == "disk"
+    assert store.memory_used == 0
+    assert store.spilled_count == 1
+    assert read_segment(store, 0) == b"c" * 60 + b"d" * 60
+
+
+def test_announced_size_over_limit_goes_straight_to_disk(tmp_path):
+    store = make_store(tmp_path)
+    # Preallocated for 500 bytes, truncated to what actually arrived
+    assert store.store(0, [b"g" * 10], expected_size=500) == 10
+    assert backend_name(store, 0) == "disk"
+    assert (tmp_path / "segment_00000.ts").stat().st_size == 10
+    assert store.peak_memory_used == 0
+
+
+def test_total_budget_spills_and_release_frees_it(tmp_path):
+    store = make_store(tmp_path)
+    store.store(0, [b"e" * 90])
+    store.store(1, [b"f" * 90])
+    store.store(2, [b"g" * 90])  # 270 > 250 budget
+    assert [backend_name(store, i) for i in range(3)] == ["memory", "memory", "disk"]
+    assert store.memory_used == 180
+    assert store.peak_memory_used == 180
+
+    store.release(0)
+    assert store.memory_used == 90
+    store.store(3, [b"h" * 90])
+    assert backend_name(store, 3) == "memory"
+    assert store.memory_count == 3
+    assert store.spilled_count == 1
+
+
+def test_failed_download_releases_reservation_and_file(tmp_path):
+    store = make_store(tmp_path)
+
+    def broken_chunks(first, size):
+        yield first * size
+        raise OSError("connection reset")
+
+    with pytest.raises(OSError):
+        store.store(0, broken_chunks(b"x", 80))
+    assert store.memory_used == 0
+    assert 0 not in store
+
+    # Fails after spilling: the partial file is removed as well
+    with pytest.raises(OSError):
+        store.store(1, broken_chunks(b"y", 200))
+    assert store.memory_used == 0
+    assert 1 not in store
+    assert not (tmp_path / "segment_00001.ts").exists()
+
+
+def test_path_for_moves_memory_segment_to_disk(tmp_path):
+    store = make_store(tmp_path)
+    store.store(0, [b"a" * 90])
+    path = store.path_for(0)
+    assert open(path, "rb").read() == b"a" * 90
+    assert backend_name(store, 0) == "disk"
+    assert store.memory_used == 0
+
+
+def test_close_releases_everything(tmp_path):
+    store = make_store(tmp_path)
+    store.store(0, [b"a" * 90])
+    store.store(1, [b"b" * 200])
+    store.close()
+    assert store.memory_used == 0
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_iter_all_views_joins_segments_in_order(tmp_path):
+    store = make_store(tmp_path)
+    store.store(0, [b"a" * 50])
+    store.store(1, [b"b" * 150])
+    store.store(2, [b"c" * 5])
+    joined = b"".join(bytes(view) for view in store.iter_all_views([0, 1, 2]))
+    assert joined == b"a" * 50 + b"b" * 150 + b"c" * 5
+
+
+def test_looks_like_mpegts(tmp_path):
+    store = make_store(tmp_path)
+    store.store(0, [b"\x47" + b"\x00" * 187])
+    store.store(1, [b"\xff\xf1" + b"\x00" * 10])
+    store.store(2, [b"\x47" + b"\x00" * 300])  # spilled
+    assert store.looks_like_mpegts(0)
+    assert not store.looks_like_mpegts(1)
+    assert store.looks_like_mpegts(2)
+
+
+@pytest.mark.parametrize("playlist, expected", [
+    ("#EXTM3U\n#EXTINF:4,\na.ts\n#EXTINF:4,\nb.ts?token=1\n", True),
+    ("#EXTM3U\n#EXTINF:4,\nsegment-1\n", True),
+    ("#EXTM3U\n#EXTINF:4,\na.aac\n", False),
+    ("#EXTM3U\n#EXT-X-MAP:URI=\"init.mp4\"\n#EXTINF:4,\na.m4s\n", False),
+])
+def test_playlist_may_be_mpegts(playlist, expected):
+    assert app.playlist_may_be_mpegts(m3u8.loads(playlist)) is expected
+
+
+@pytest.mark.parametrize("playlist, expected", [
+    ("#EXTM3U\n#EXTINF:4,\na.ts\n#EXTINF:4,\nb.TS?token=1\n", True),
+    ("#EXTM3U\n#EXTINF:4,\na.ts\n#EXTINF:4,\nsegment-2\n", False),
+    ("#EXTM3U\n#EXTINF:4,\na.aac\n", False),
+])
+def test_playlist_is_mpegts_by_name(playlist, expected):
+    assert app.playlist_is_mpegts_by_name(m3u8.loads(playlist)) is expected
+
+
+def test_pipe_strategy_requires_mpegts():
+    info = {"demuxers": ["concat", "mpegts"],
+            "protocols": {"input": ["concat", "file", "pipe"], "output": ["file"]}}
+    assert app.select_remux_strategy(info) == "pipe"
+    assert app.select_remux_strategy(info, mpegts=False) == "concat_demuxer"
@@ -0,0 +1,96 @@
+import errno
+import io
+import time
+
+import pytest
+import requests
+
+import app
+
+
+def test_create_transport_falls_back_for_unknown_name():
+    messages = []
+    transport = app.create_transport("http3", messages.append)
+    try:
+        assert isinstance(transport, app.RequestsTransport)
+        assert "Unknown transport 'http3'" in messages[0]
+    finally:
+        transport.close()
+
+
+def test_create_transport_falls_back_without_httpx(monkeypatch):
+    monkeypatch.setattr(app, "httpx", None)
+    messages = []
+    transport = app.create_transport("http2", messages.append)
+    try:
+        assert isinstance(transport, app.RequestsTransport)
+        assert "HTTP/2 unavailable" in messages[0]
+        assert "pip install" in messages[0]
+    finally:
+        transport.close()
+
+
+def test_requests_transport_raises_its_error_on_http_error(monkeypatch):
+    response = requests.Response()
+    response.status_code = 404
+    response.url = "http://example.com/seg0.ts"
+    response.raw = io.BytesIO(b"not found")
+    transport = app.RequestsTransport()
+    monkeypatch.setattr(transport.session, "get", lambda url, **kwargs: response)
+    try:
+        with pytest.raises(transport.errors):
+            with transport.stream(response.url):
+                pytest.fail("stream() yielded for a 404")
+    finally:
+        transport.close()
+
+
+def test_http2_transport_errors_cover_http_status_errors():
+    httpx = pytest.importorskip("httpx")
+    assert issubclass(httpx.HTTPStatusError, app.Http2Transport.errors)
+    assert issubclass(httpx.ConnectError, app.Http2Transport.errors)
+
+
+def test_failed_segment_is_reported_and_the_rest_is_saved(offline_download,
+                                                         make_playlist):
+    offline_download.bodies["seg1.ts"] = ConnectionError("connection reset")
+    messages = offline_download.run(make_playlist([4.0] * 4))
+    assert offline_download.transport.requested == [f"seg{i}.ts" for i in range(4)]
+    assert "Error downloading segment 2: connection reset" in messages
+    assert any(m.startswith("ERROR: 1 of 4 segments") for m in messages)
+    assert any(m.startswith("Incomplete video saved as") for m in messages)
+
+
+def test_disk_error_stops_the_download(offline_download, make_playlist):
+    disk_full = OSError(errno.ENOSPC, "No space left on device")
+    offline_download.bodies["seg1.ts"] = disk_full
+    messages = offline_download.run(make_playlist([4.0] * 6))
+    # The segments after the failed one are never fetched, nor remuxed
+    assert offline_download.transport.requested == ["seg0.ts", "seg1.ts"]
+    assert offline_download.commands == []
+    assert any("An unexpected error occurred" in m and "No space left" in m
+               for m in messages)
+    assert not any("saved" in m for m in messages)
+
+
+def test_failed_remux_skips_queued_periods(offline_download, make_playlist,
+                                           monkeypatch):
+    monkeypatch.setattr(app, "REMUX_WORKERS", 1)
+    offline_download.transport.max_concurrency = 6
+    offline_download.returncodes["period_0000.ts"] = 1
+    run_ffmpeg = offline_download.run_ffmpeg
+
+    def fail_once_all_periods_are_queued(cmd, timeout, input_chunks=None):
+        # Hold the first period's FFmpeg until the other periods wait behind it
+        deadline = time.monotonic() + 5
+        while "Remuxing period 3/3 (2 segments)..." not in offline_download.messages:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        return run_ffmpeg(cmd, timeout, input_chunks)
+
+    monkeypatch.setattr(app, "run_ffmpeg", fail_once_all_periods_are_queued)
+    playlist = make_playlist([4.0] * 6, discontinuities={2, 4})
+    messages = offline_download.run(playlist)
+    assert offline_download.outputs() == ["period_0000.ts"]
+    assert "ERROR: FFmpeg failed to combine video segments." in messages
+    assert "FFmpeg stderr: stub failure" in messages